@@ -0,0 +1,423 @@
+import os
+import asyncio
+import json
+from collections import OrderedDict, deque, namedtuple
+from dataclasses import dataclass, field
+import ccxt.pro as ccxtpro
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, classification_report
+from joblib import dump, load
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry as RedisRetry
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import logging
+from dotenv import load_dotenv
+import tempfile
+import time
+
+from indicators_numba import _bbands, _rsi, _sma
+
+
+load_dotenv()
+
+# Binance API setup
+exchange = ccxtpro.binance(
+    {
+        "apiKey": os.getenv("BINANCE_API_KEY"),  # get apis from binance testnet
+        "secret": os.getenv("BINANCE_API_SECRET"),
+        "options": {"defaultType": "future"},
+    }
+)
+
+# Spot client for the Telegram price alerts
+spot_exchange = ccxtpro.binance(
+    {
+        "apiKey": os.getenv("BINANCE_API_KEY"),
+        "secret": os.getenv("BINANCE_API_SECRET"),
+    }
+)
+# exchange.set_sandbox_mode(True)  # for testing, disable in prod
+
+# Redis cache for news sentiment
+cache = redis.Redis(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    decode_responses=True,
+    socket_connect_timeout=1,  # Don't stall sentiment calls on an unreachable cache
+    socket_timeout=1,
+    retry=RedisRetry(NoBackoff(), 0),  # A cache miss is cheaper than retrying
+)
+
+analyzer = SentimentIntensityAnalyzer()
+
+# Shared HTTP session so news requests reuse pooled connections
+http = requests.Session()
+http.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=3, backoff_factor=0.5),
+    ),
+)
+
+
+price_check_interval = 60  # Seconds between Telegram price checks
+ticker_cache = {}  # (market, pair) -> (monotonic time, last price)
+ticker_ttl = price_check_interval * 0.9  # One refresh per check, shared by every chat
+model_path = "ml_model.joblib"
+model_cache = {}  # Model path -> (mtime, model) last loaded from or saved to disk
+model_params = {"max_iter": 100, "max_depth": 6}
+fit_cache = OrderedDict()  # Hash of training data -> fitted model
+fit_cache_size = 8
+training_counts = {}  # Model path -> calls since the last retrain
+feature_columns = ["rsi", "bb_upper", "bb_lower", "sma"]
+training_lock = asyncio.Lock()  # Only one training run at a time
+trailing_stop_loss_pct = 0.02
+take_profit_ratio = 0.05
+top_pairs = ["BTC/USDT", "ETH/USDT", "BNB/USDT", "XRP/USDT", "ADA/USDT"]
+news_query = "crypto OR bitcoin OR ethereum"
+sentiment_ttl = 120  # seconds
+
+
+# sentiments??
+
+
+class OHLCV(namedtuple("OHLCV", "ts open high low close volume")):
+    """Column views over a raw OHLCV array."""
+
+    __slots__ = ()
+
+    @property
+    def empty(self):
+        return len(self.close) == 0
+
+
+empty_ohlcv = OHLCV(*np.empty((0, 6)).T)
+
+
+async def fetch_latest_prices(pairs, client=exchange):
+    """Fetch the last traded price of each pair, reused for ``ticker_ttl`` seconds."""
+    market = client.options.get("defaultType")
+    now = time.monotonic()
+    stale = [
+        pair
+        for pair in pairs
+        if now - ticker_cache.get((market, pair), (-ticker_ttl, None))[0] >= ticker_ttl
+    ]
+    try:
+        if stale:
+            # One request covers every pair instead of one per pair
+            tickers = await client.fetch_tickers(stale)
+            for pair, ticker in tickers.items():
+                if ticker.get("last") is not None:
+                    ticker_cache[(market, pair)] = (now, ticker["last"])
+    except Exception as e:
+        logging.error(f"Error fetching latest prices: {e}")
+    return {
+        pair: ticker_cache[(market, pair)][1]
+        for pair in pairs
+        if (market, pair) in ticker_cache
+    }
+
+
+async def fetch_market_data(pair, timeframe="1h", limit=100, client=exchange):
+    """Fetch historical OHLCV data for the given trading pair."""
+    try:
+        ohlcv = await client.fetch_ohlcv(pair, timeframe=timeframe, limit=limit)
+        if not ohlcv:
+            logging.warning(f"No data returned for {pair}.")
+            return empty_ohlcv
+        return OHLCV(*np.asarray(ohlcv, dtype=np.float64).T)
+    except Exception as e:
+        logging.error(f"Error fetching market data for {pair}: {e}")
+        return empty_ohlcv
+
+
+def compute_technical_indicators(data):
+    """Compute RSI, Bollinger Bands, and SMA, keeping float32 input as float32."""
+    close = np.asarray(data.close)
+    dtype = close.dtype if close.dtype == np.float32 else np.float64
+    close = close.astype(np.float64, copy=False)
+    bb_middle, bb_upper, bb_lower = _bbands(close, 20, 2.0)
+    return pd.DataFrame(
+        {
+            "close": np.asarray(data.close, dtype=dtype),
+            "volume": np.asarray(data.volume),
+            "bb_middle": bb_middle.astype(dtype, copy=False),
+            "bb_upper": bb_upper.astype(dtype, copy=False),
+            "bb_lower": bb_lower.astype(dtype, copy=False),
+            "sma": _sma(close, 26).astype(dtype, copy=False),
+            "rsi": _rsi(close, 14).astype(dtype, copy=False),
+        },
+        index=data.index if isinstance(data, pd.DataFrame) else None,
+    )
+
+
+def get_sentiment(text):
+    """Calculate sentiment polarity from text."""
+    return analyzer.polarity_scores(text)["compound"]
+
+
+def cache_get(key):
+    """Read a value from Redis, returning None if the cache is unavailable."""
+    try:
+        return cache.get(key)
+    except redis.RedisError as e:
+        logging.warning(f"Redis cache unavailable: {e}")
+        return None
+
+
+def cache_set(key, value, ttl=None):
+    """Write a value to Redis, ignoring cache outages."""
+    try:
+        cache.set(key, value, ex=ttl)
+    except redis.RedisError as e:
+        logging.warning(f"Redis cache unavailable: {e}")
+
+
+def fetch_latest_sentiment():
+    """Fetch sentiment scores from real-time news or social media."""
+    score_key = f"sentiment:{news_query}"
+    headlines_key = f"headlines:{news_query}"
+    cached_score = cache_get(score_key)
+    if cached_score is not None:
+        return float(cached_score)
+
+    try:
+        news_response = http.get(
+            "https://newsapi.org/v2/everything",
+            params={
+                "q": news_query,
+                "sortBy": "publishedAt",
+                "apiKey": os.getenv("NEWS_API_KEY"),
+            },
+            timeout=10,
+        )
+        if news_response.status_code == 200:
+            articles = news_response.json().get("articles", [])
+            if not articles:
+                logging.warning("No articles found for sentiment analysis.")
+            headlines = [article["title"] for article in articles]
+            if headlines:
+                cache_set(headlines_key, json.dumps(headlines))
+        else:
+            logging.warning(f"News API error: {news_response.status_code}")
+            headlines = None
+    except Exception as e:
+        logging.error(f"Error fetching real-time sentiment: {e}")
+        headlines = None
+
+    if headlines is None:
+        # Fall back to the last known headlines
+        cached_headlines = cache_get(headlines_key)
+        if cached_headlines is None:
+            return 0
+        logging.info("Using cached headlines for sentiment analysis.")
+        headlines = json.loads(cached_headlines)
+
+    scores = [get_sentiment(headline) for headline in headlines if headline]
+    score = float(np.mean(scores)) if scores else 0.0
+    cache_set(score_key, score, ttl=sentiment_ttl)
+    return score
+
+
+# --- ML Functions ---
+def model_sidecar_path(model_path, suffix):
+    """Path of a file stored alongside the model, e.g. ml_model_state.json."""
+    return os.path.splitext(model_path)[0] + suffix
+
+
+def load_training_count(model_path=model_path):
+    """Read the persisted retraining counter."""
+    try:
+        with open(model_sidecar_path(model_path, "_state.json")) as f:
+            return int(json.load(f)["training_count"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+
+def save_training_count(model_path=model_path):
+    """Persist the retraining counter so restarts don't force a retrain."""
+    state_path = model_sidecar_path(model_path, "_state.json")
+    try:
+        # Write a temp file and swap it in so a crash never leaves a torn file
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(state_path) or ".", suffix=".tmp", delete=False
+        ) as f:
+            json.dump({"training_count": training_counts[model_path]}, f)
+        os.replace(f.name, state_path)
+    except OSError as e:
+        logging.warning(f"Could not save training state: {e}")
+
+
+def fit_model(data):
+    """Fit a classifier, reusing an earlier fit on identical data."""
+    key = pd.util.hash_pandas_object(
+        data[feature_columns + ["close"]], index=False
+    ).values.tobytes()
+    if key in fit_cache:
+        fit_cache.move_to_end(key)
+        return fit_cache[key]
+
+    X = data[feature_columns].to_numpy(dtype=np.float32, copy=False)
+    close = data["close"].to_numpy()
+    y = (close[1:] > close[:-1]).astype(np.int8)
+    model = HistGradientBoostingClassifier(**model_params)
+    model.fit(X[:-1], y)
+    fit_cache[key] = model
+    if len(fit_cache) > fit_cache_size:
+        fit_cache.popitem(last=False)
+    return model
+
+
+def train_or_load_model(data, retrain_interval=100, model_path=model_path):
+    """Train or load the ML model with periodic retraining."""
+    if model_path not in training_counts:
+        training_counts[model_path] = load_training_count(model_path)
+    training_counts[model_path] += 1
+
+    if os.path.exists(model_path) and training_counts[model_path] < retrain_interval:
+        save_training_count(model_path)
+        mtime = os.path.getmtime(model_path)
+        cached = model_cache.get(model_path)
+        if cached is None or cached[0] != mtime:
+            cached = model_cache[model_path] = (mtime, load(model_path))
+            logging.info("ML model loaded.")
+        return cached[1]
+
+    if data.empty:
+        logging.warning("No data available for training the model.")
+        return None
+    model = fit_model(data)
+    dump(model, model_path, compress=0, protocol=5)
+    logging.info("ML model trained and saved.")
+    training_counts[model_path] = 0
+    save_training_count(model_path)
+    model_cache[model_path] = (os.path.getmtime(model_path), model)
+    return model
+
+
+async def train_or_load_model_async(data, retrain_interval=100, model_path=model_path):
+    """Train or load the ML model on a worker thread without blocking the event loop."""
+    async with training_lock:
+        return await asyncio.to_thread(
+            train_or_load_model, data, retrain_interval, model_path
+        )
+
+
+def predict_price_movement(model, data):
+    """Predict whether the price will increase or decrease."""
+    # A fresh row per call, predictions may run on several worker threads
+    features = np.array(
+        [[data[column].to_numpy()[-1] for column in feature_columns]], dtype=np.float32
+    )
+    prediction = model.predict(features)
+    return prediction[0]
+
+
+# --- Trade Execution ---
+# def place_order(order_type, pair, amount):
+#     """Place buy or sell orders securely."""
+#     try:
+#         if order_type == "buy":
+#             order = exchange.create_market_buy_order(pair, amount)
+#         elif order_type == "sell":
+#             order = exchange.create_market_sell_order(pair, amount)
+#         else:
+#             logging.error(f"Invalid order type: {order_type}")
+#             return None
+#         logging.info(f"{order_type.capitalize()} order placed: {order}")
+#         return order
+#     except Exception as e:
+#         logging.error(f"Error placing {order_type} order for {pair}: {e}")
+#         return None
+
+
+def trailing_stop_loss(entry_price, current_price, pct=trailing_stop_loss_pct):
+    """Calculate the trailing stop-loss price, element-wise for arrays of positions."""
+    stop = np.maximum(entry_price, current_price) * (1 - pct)
+    return float(stop) if np.ndim(stop) == 0 else stop
+
+
+@dataclass(slots=True)
+class IndicatorState:
+    """Running SMA, Bollinger Band and RSI values updated in O(1) per close."""
+
+    sma_window: int = 26
+    bb_window: int = 20
+    bb_k: float = 2.0
+    rsi_window: int = 14
+    closes: deque = field(init=False)
+    count: int = 0
+    shift: float = 0.0  # First close, keeps the BB sum of squares well conditioned
+    sma_sum: float = 0.0
+    bb_sum: float = 0.0
+    bb_sum_sq: float = 0.0
+    rsi_avg_gain: float = 0.0
+    rsi_avg_loss: float = 0.0
+    sma: float = np.nan
+    bb_middle: float = np.nan
+    bb_upper: float = np.nan
+    bb_lower: float = np.nan
+    rsi: float = np.nan
+
+    def __post_init__(self):
+        self.closes = deque(maxlen=max(self.sma_window, self.bb_window, 2))
+
+    @classmethod
+    def from_closes(cls, closes, **kwargs):
+        """Build a state by replaying historical closes."""
+        state = cls(**kwargs)
+        for close in closes:
+            state.update(close)
+        return state
+
+    def update(self, close):
+        """Add a closed candle's price and refresh the indicators."""
+        close = float(close)
+        closes = self.closes
+        if self.count == 0:
+            self.shift = close
+        else:
+            diff = close - closes[-1]
+            n = self.rsi_window
+            self.rsi_avg_gain = (self.rsi_avg_gain * (n - 1) + max(diff, 0.0)) / n
+            self.rsi_avg_loss = (self.rsi_avg_loss * (n - 1) + max(-diff, 0.0)) / n
+
+        self.sma_sum += close
+        if self.count >= self.sma_window:
+            self.sma_sum -= closes[-self.sma_window]
+
+        x = close - self.shift
+        self.bb_sum += x
+        self.bb_sum_sq += x * x
+        if self.count >= self.bb_window:
+            old = closes[-self.bb_window] - self.shift
+            self.bb_sum -= old
+            self.bb_sum_sq -= old * old
+
+        closes.append(close)
+        self.count += 1
+
+        if self.count >= self.sma_window:
+            self.sma = self.sma_sum / self.sma_window
+        if self.count >= self.bb_window:
+            mean = self.bb_sum / self.bb_window
+            std = max(self.bb_sum_sq / self.bb_window - mean * mean, 0.0) ** 0.5
+            self.bb_middle = mean + self.shift
+            self.bb_upper = self.bb_middle + self.bb_k * std
+            self.bb_lower = self.bb_middle - self.bb_k * std
+        if self.count >= self.rsi_window:
+            if self.rsi_avg_loss == 0:
+                self.rsi = 100.0
+            else:
+                rs = self.rsi_avg_gain / self.rsi_avg_loss
+                self.rsi = 100.0 - 100.0 / (1.0 + rs)
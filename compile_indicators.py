@@ -0,0 +1,23 @@
+"""Build the indicator kernels ahead of time into the indicators_aot extension.
+
+Run ``python compile_indicators.py`` once per platform; indicators_numba then
+imports the compiled module instead of JIT-compiling at startup.
+"""
+from numba.pycc import CC
+
+from indicators_numba import (
+    bbands,
+    bbands_signature,
+    rsi,
+    rsi_signature,
+    sma,
+    sma_signature,
+)
+
+cc = CC("indicators_aot")
+cc.export("sma", sma_signature)(sma)
+cc.export("bbands", bbands_signature)(bbands)
+cc.export("rsi", rsi_signature)(rsi)
+
+if __name__ == "__main__":
+    cc.compile()
@@ -0,0 +1,94 @@
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional, fall back to plain Python
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# Inputs are read-only so pandas' copy-on-write arrays match without a copy
+_closes = "Array(float64, 1, 'A', readonly=True)"
+sma_signature = f"float64[:]({_closes}, int64)"
+bbands_signature = f"UniTuple(float64[:], 3)({_closes}, int64, float64)"
+rsi_signature = f"float64[:]({_closes}, int64)"
+
+
+def sma(close, n):
+    """Simple moving average, NaN until the window is full."""
+    out = np.full(close.shape[0], np.nan)
+    total = 0.0
+    for i in range(close.shape[0]):
+        total += close[i]
+        if i >= n:
+            total -= close[i - n]
+        if i >= n - 1:
+            out[i] = total / n
+    return out
+
+
+def bbands(close, n, k):
+    """Bollinger Bands (middle, upper, lower) using a population std."""
+    size = close.shape[0]
+    middle = np.full(size, np.nan)
+    upper = np.full(size, np.nan)
+    lower = np.full(size, np.nan)
+    if size == 0:
+        return middle, upper, lower
+    # Sums are taken relative to the first close to limit cancellation
+    shift = close[0]
+    total = 0.0
+    total_sq = 0.0
+    for i in range(size):
+        x = close[i] - shift
+        total += x
+        total_sq += x * x
+        if i >= n:
+            old = close[i - n] - shift
+            total -= old
+            total_sq -= old * old
+        if i >= n - 1:
+            mean = total / n
+            std = np.sqrt(max(total_sq / n - mean * mean, 0.0))
+            middle[i] = mean + shift
+            upper[i] = middle[i] + k * std
+            lower[i] = middle[i] - k * std
+    return middle, upper, lower
+
+
+def rsi(close, n):
+    """Relative Strength Index with Wilder smoothing."""
+    out = np.full(close.shape[0], np.nan)
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(close.shape[0]):
+        gain = 0.0
+        loss = 0.0
+        if i > 0:
+            diff = close[i] - close[i - 1]
+            if diff > 0:
+                gain = diff
+            elif diff < 0:
+                loss = -diff
+            avg_gain = (avg_gain * (n - 1) + gain) / n
+            avg_loss = (avg_loss * (n - 1) + loss) / n
+        if i >= n - 1:
+            if avg_loss == 0:
+                out[i] = 100.0
+            else:
+                out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+try:
+    # Built ahead of time by compile_indicators.py, loads without JIT warm-up
+    from indicators_aot import bbands as _bbands, rsi as _rsi, sma as _sma
+except ImportError:
+    # Explicit signatures compile eagerly at import and are cached on disk
+    _sma = njit(sma_signature, cache=True, nogil=True)(sma)
+    _bbands = njit(bbands_signature, cache=True, nogil=True)(bbands)
+    _rsi = njit(rsi_signature, cache=True, nogil=True)(rsi)
@@ -1,53 +1,28 @@
 import os
 import logging
-import time
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import Application, CommandHandler, ContextTypes
-from dotenv import load_dotenv
-import pandas as pd
-import ccxt
 import asyncio
 import nest_asyncio
 
-# Load environment variables
-load_dotenv()
+from bot_core import (
+    fetch_latest_prices,
+    price_check_interval,
+    spot_exchange,
+    top_pairs,
+)
 
 # Configure logging
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
 )
 
-# Binance API setup
-exchange = ccxt.binance(
-    {
-        "apiKey": os.getenv("BINANCE_API_KEY"),
-        "secret": os.getenv("BINANCE_API_SECRET"),
-    }
-)
-
 # Global variables
-top_pairs = ["BTC/USDT", "ETH/USDT", "BNB/USDT", "XRP/USDT", "ADA/USDT"]
 last_notified_price = {}  # To track previous prices for notifications
 user_preferences = {}  # Global variable to store user preferences
 
 
-# Fetch market data
-def fetch_market_data(pair, timeframe="1h", limit=2):
-    """Fetch historical OHLCV data for the given trading pair."""
-    try:
-        ohlcv = exchange.fetch_ohlcv(pair, timeframe=timeframe, limit=limit)
-        df = pd.DataFrame(
-            ohlcv, columns=["timestamp", "open", "high", "low", "close", "volume"]
-        )
-        df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-        if df.empty:
-            logging.warning(f"No data returned for {pair}.")
-        return df
-    except Exception as e:
-        logging.error(f"Error fetching market data for {pair}: {e}")
-        return pd.DataFrame()
-
-
 # Telegram bot handlers
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send a welcome message."""
@@ -80,13 +55,14 @@ async def check_prices(context: ContextTypes.DEFAULT_TYPE):
     # Get the chat_id from the job context
     chat_id = context.job.chat_id  # Use context.job.chat_id instead of job.context
 
+    messages = []  # Sent together once all pairs are checked
+    prices = await fetch_latest_prices(top_pairs, client=spot_exchange)
     for pair in top_pairs:
-        data = fetch_market_data(pair)
-        if data.empty or len(data) < 2:
+        if pair not in prices:
             continue
 
-        # Get the recent close price
-        recent_close = data["close"].iloc[-1]
+        # Get the live price
+        recent_close = prices[pair]
 
         # Get user preference
         user_pref = user_preferences.get(chat_id)
@@ -106,13 +82,18 @@ async def check_prices(context: ContextTypes.DEFAULT_TYPE):
         # Only send notification if the profit exceeds 5%
         if percentage_profit >= 5:
             user_preferences[chat_id]["last_price"] = recent_close  # Update the last tracked price
-            message = (
+            messages.append(
                 f"🚀 *{pair}* has increased by {percentage_profit:.2f}%!\n"
                 f"💰 New Price: {recent_close:.2f} USDT"
             )
+
+    if messages:
+        try:
             await context.bot.send_message(
-                chat_id=chat_id, text=message, parse_mode="Markdown"
+                chat_id=chat_id, text="\n\n".join(messages), parse_mode="Markdown"
             )
+        except TelegramError as e:
+            logging.error(f"Error sending price notification to {chat_id}: {e}")
 
 async def schedule_price_checks(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Schedule price checks to run every minute."""
@@ -120,7 +101,7 @@ async def schedule_price_checks(update: Update, context: ContextTypes.DEFAULT_TY
         logging.error("Job queue is not available.")
         return
     context.job_queue.run_repeating(
-        check_prices, interval=60, chat_id=update.effective_chat.id
+        check_prices, interval=price_check_interval, chat_id=update.effective_chat.id
     )
     await update.message.reply_text(
         "Price monitoring started. You will receive notifications for significant price changes."
@@ -140,7 +121,10 @@ async def main():
 
     # Run the bot
     logging.info("Bot is running...")
-    await application.run_polling()
+    try:
+        await application.run_polling()
+    finally:
+        await spot_exchange.close()
 
 
 if __name__ == "__main__":
@@ -1,46 +1,308 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
 import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+import numpy as np
 import pandas as pd
-from main import fetch_market_data, compute_technical_indicators, train_or_load_model
+import pytest
+import redis
+import requests
+import sklearn
+from sklearn.ensemble import HistGradientBoostingClassifier
+from ta.momentum import RSIIndicator
+from ta.trend import SMAIndicator
+from ta.volatility import BollingerBands
+from bot_core import (
+    IndicatorState,
+    compute_technical_indicators,
+    exchange,
+    fetch_latest_prices,
+    fetch_latest_sentiment,
+    fetch_market_data,
+    fit_cache,
+    fit_model,
+    model_cache,
+    get_sentiment,
+    model_params,
+    news_query,
+    predict_price_movement,
+    price_check_interval,
+    sentiment_ttl,
+    spot_exchange,
+    ticker_cache,
+    top_pairs,
+    train_or_load_model,
+    train_or_load_model_async,
+    trailing_stop_loss,
+    trailing_stop_loss_pct,
+    training_counts,
+)
+
+# Binance-style OHLCV rows: [timestamp, open, high, low, close, volume]
+SAMPLE_OHLCV = [
+    [1700000000000 + i * 3600000, 100 + i, 102 + i, 99 + i, 101 + i, 10 + i]
+    for i in range(10)
+]
+
+HEADLINES = ["Bitcoin surges as investors celebrate strong gains", "Exchange hacked and funds stolen"]
+SCORE_KEY = f"sentiment:{news_query}"
+HEADLINES_KEY = f"headlines:{news_query}"
+
+REQUIRED_COLS = frozenset({"rsi", "sma", "bb_middle", "bb_upper", "bb_lower"})
+
+# Rising mock market data with pullbacks, enough rows for the indicators
+_N = 20
+_CLOSE = (np.linspace(100.0, 125.0, _N) + np.tile([1.5, -1.5], _N // 2)).astype(np.float32)
+_COLUMNS = ["open", "high", "low", "close", "volume"]
+_OHLCV = np.column_stack([
+    _CLOSE,
+    _CLOSE + 1,
+    _CLOSE - 1,
+    _CLOSE,
+    np.linspace(5.0, 55.0, _N, dtype=np.float32),
+])
 
 class TestCryptoBot(unittest.TestCase):
 
-    def test_fetch_market_data(self):
-        # Test fetching market data for a valid pair
-        data = fetch_market_data("BTC/USDT", "1h", limit=10)
-        self.assertFalse(data.empty, "Market data should not be empty for valid pair.")
+    @classmethod
+    def setUpClass(cls):
+        # Warm up the indicator kernels so no test pays for compilation
+        compute_technical_indicators(pd.DataFrame(
+            np.zeros((30, len(_COLUMNS)), dtype=np.float32), columns=_COLUMNS
+        ))
 
-    def test_apply_technical_indicators(self):
         # Mock data simulating fetched market data with sufficient rows
-        sample_data = pd.DataFrame({
-            "open": [100, 102, 101, 105, 107, 110, 108, 109, 111, 115, 116, 117, 118, 119, 120, 121, 122, 123, 124, 125],
-            "high": [102, 103, 102, 106, 108, 111, 109, 110, 112, 116, 117, 118, 119, 120, 121, 122, 123, 124, 125, 126],
-            "low": [99, 101, 100, 104, 106, 109, 107, 108, 110, 114, 115, 116, 117, 118, 119, 120, 121, 122, 123, 124],
-            "close": [100, 102, 101, 105, 107, 110, 108, 109, 111, 115, 116, 117, 118, 119, 120, 121, 122, 123, 124, 125],
-            "volume": [10, 15, 10, 20, 25, 30, 20, 15, 10, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55]
-        })
-        
-        # Call the function to compute technical indicators
-        indicators = compute_technical_indicators(sample_data)
-        
-        # Check if the expected columns are present in the output DataFrame
-        self.assertIn("rsi", indicators.columns, "RSI should be calculated and added to DataFrame.")
-        self.assertIn("sma", indicators.columns, "SMA should be calculated and added to DataFrame.")
-        self.assertIn("bb_middle", indicators.columns, "Bollinger Bands middle should be calculated and added to DataFrame.")
-        self.assertIn("bb_upper", indicators.columns, "Bollinger Bands upper should be calculated and added to DataFrame.")
-        self.assertIn("bb_lower", indicators.columns, "Bollinger Bands lower should be calculated and added to DataFrame.")
+        cls.sample_ohlcv = pd.DataFrame(_OHLCV, columns=_COLUMNS, copy=False)
+        assert cls.sample_ohlcv._mgr.nblocks == 1, "Sample data should be a single float32 block."
+        cls.indicators = compute_technical_indicators(cls.sample_ohlcv)
 
-    def test_train_or_load_model(self):
         # Mock data for model training
-        sample_data = pd.DataFrame({
+        cls.features = pd.DataFrame({
             "rsi": [30, 40, 50, 60, 70],
             "bb_upper": [110, 112, 114, 116, 118],
             "bb_lower": [90, 88, 86, 84, 82],
             "sma": [100, 101, 102, 103, 104],
             "close": [100, 102, 101, 105, 107],
         })
-        
-        model = train_or_load_model(sample_data)
+
+        # Content-addressed model file so later runs load instead of retraining,
+        # keyed on the data, the scikit-learn version and the model settings
+        params = HistGradientBoostingClassifier(**model_params).get_params()
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(pd.util.hash_pandas_object(cls.features).values.tobytes())
+        digest.update(sklearn.__version__.encode())
+        digest.update(repr(sorted(params.items())).encode())
+        cls.model_path = os.path.join(tempfile.gettempdir(), f"crypto_bot_{digest.hexdigest()}.joblib")
+
+    @patch.object(exchange, "fetch_ohlcv", new_callable=AsyncMock, return_value=SAMPLE_OHLCV)
+    def test_fetch_market_data(self, fetch_ohlcv):
+        # Test parsing market data for a valid pair without hitting the exchange
+        data = asyncio.run(fetch_market_data("BTC/USDT", "1h", limit=10))
+        fetch_ohlcv.assert_awaited_once_with("BTC/USDT", timeframe="1h", limit=10)
+        self.assertFalse(data.empty, "Market data should not be empty for valid pair.")
+        self.assertEqual(data.close.tolist(), [row[4] for row in SAMPLE_OHLCV])
+
+    def test_fetch_latest_prices_shares_tickers(self):
+        tickers = {pair: {"last": 100.0 + i} for i, pair in enumerate(top_pairs)}
+        with patch("bot_core.time.monotonic") as clock, \
+                patch.dict(ticker_cache, clear=True), \
+                patch.object(spot_exchange, "fetch_ohlcv", new_callable=AsyncMock) as fetch_ohlcv, \
+                patch.object(spot_exchange, "fetch_tickers", new_callable=AsyncMock, return_value=tickers) as fetch_tickers:
+            # Two chats checking within one interval share a single request
+            for now in (0.0, 20.0):
+                clock.return_value = now
+                prices = asyncio.run(fetch_latest_prices(top_pairs, client=spot_exchange))
+            fetch_tickers.assert_awaited_once_with(top_pairs)
+            self.assertEqual(prices, {pair: ticker["last"] for pair, ticker in tickers.items()})
+
+            # The next scheduled check refreshes the prices
+            clock.return_value = price_check_interval
+            asyncio.run(fetch_latest_prices(top_pairs, client=spot_exchange))
+            self.assertEqual(fetch_tickers.await_count, 2)
+            fetch_ohlcv.assert_not_awaited()
+
+    def fetch_sentiment(self, cached, **http_get):
+        """Run fetch_latest_sentiment against a dict-backed Redis and a mocked news API."""
+        cache = MagicMock()
+        cache.get.side_effect = cached.get
+        with patch("bot_core.cache", cache), patch("bot_core.http.get", **http_get) as get:
+            score = fetch_latest_sentiment()
+        return score, cache, get
+
+    def test_sentiment_cache_hit(self):
+        score, cache, get = self.fetch_sentiment({SCORE_KEY: "0.25"})
+        self.assertEqual(score, 0.25)
+        get.assert_not_called()
+        cache.set.assert_not_called()
+
+    def test_sentiment_cache_miss(self):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"articles": [{"title": title} for title in HEADLINES]}
+        score, cache, get = self.fetch_sentiment({}, return_value=response)
+        expected = float(np.mean([get_sentiment(title) for title in HEADLINES]))
+        self.assertAlmostEqual(score, expected)
+        cache.set.assert_any_call(HEADLINES_KEY, json.dumps(HEADLINES), ex=None)
+        cache.set.assert_any_call(SCORE_KEY, score, ex=sentiment_ttl)
+
+    def test_sentiment_falls_back_to_cached_headlines(self):
+        cached = {HEADLINES_KEY: json.dumps(HEADLINES)}
+        expected = float(np.mean([get_sentiment(title) for title in HEADLINES]))
+        for http_get in ({"return_value": MagicMock(status_code=429)}, {"side_effect": requests.Timeout()}):
+            with self.subTest(**http_get):
+                score, cache, get = self.fetch_sentiment(cached, **http_get)
+                self.assertAlmostEqual(score, expected)
+                cache.set.assert_called_once_with(SCORE_KEY, score, ex=sentiment_ttl)
+
+    def test_sentiment_keeps_headlines_without_articles(self):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"articles": []}
+        score, cache, get = self.fetch_sentiment({HEADLINES_KEY: json.dumps(HEADLINES)}, return_value=response)
+        self.assertEqual(score, 0.0)
+        cache.set.assert_called_once_with(SCORE_KEY, 0.0, ex=sentiment_ttl)
+
+    def test_sentiment_without_redis(self):
+        response = MagicMock(status_code=200)
+        response.json.return_value = {"articles": [{"title": title} for title in HEADLINES]}
+        cache = MagicMock()
+        cache.get.side_effect = cache.set.side_effect = redis.ConnectionError("down")
+        with patch("bot_core.cache", cache), patch("bot_core.http.get", return_value=response):
+            score = fetch_latest_sentiment()
+        self.assertAlmostEqual(score, float(np.mean([get_sentiment(title) for title in HEADLINES])))
+        cache.get.assert_called_once_with(SCORE_KEY)
+
+    @pytest.mark.integration
+    @unittest.skipUnless(os.environ.get("CRYPTO_BOT_INTEGRATION"), "requires network")
+    def test_fetch_market_data_live(self):
+        # Test fetching market data for a valid pair from the live exchange
+        async def fetch():
+            try:
+                return await fetch_market_data("BTC/USDT", "1h", limit=10)
+            finally:
+                await exchange.close()
+
+        data = asyncio.run(fetch())
+        self.assertFalse(data.empty, "Market data should not be empty for valid pair.")
+
+    def test_apply_technical_indicators(self):
+        indicators = self.indicators
+
+        # Check if the expected columns are present in the output DataFrame
+        self.assertGreaterEqual(set(indicators.columns), REQUIRED_COLS)
+        pd.testing.assert_index_equal(indicators.index, self.sample_ohlcv.index)
+        self.assertEqual(indicators["rsi"].dtype, np.float32, "Indicators should keep the float32 input dtype.")
+        self.assertTrue(indicators["rsi"].dropna().between(0, 100, inclusive="neither").all(), "RSI should see both gains and losses.")
+
+    def test_indicators_match_ta(self):
+        # Random walk with both gains and losses, longer than every window
+        close = pd.Series(
+            60000 + np.random.default_rng(1).standard_normal(200).cumsum() * 100,
+            index=pd.RangeIndex(1000, 1200),
+        )
+        indicators = compute_technical_indicators(pd.DataFrame({"close": close, "volume": 1.0}))
+        pd.testing.assert_index_equal(indicators.index, close.index)
+
+        bollinger = BollingerBands(close=close, window=20, window_dev=2)
+        expected = {
+            "bb_middle": bollinger.bollinger_mavg(),
+            "bb_upper": bollinger.bollinger_hband(),
+            "bb_lower": bollinger.bollinger_lband(),
+            "sma": SMAIndicator(close=close, window=26).sma_indicator(),
+            "rsi": RSIIndicator(close=close, window=14).rsi(),
+        }
+        for column, values in expected.items():
+            np.testing.assert_allclose(indicators[column], values, rtol=1e-9, err_msg=column)
+
+    def test_indicator_state_matches_batch(self):
+        # Longer than the 26-bar SMA window so every indicator is populated
+        close = 60000 + np.random.default_rng(2).standard_normal(120).cumsum() * 100
+        state = IndicatorState.from_closes(close)
+        last = compute_technical_indicators(pd.DataFrame({"close": close, "volume": 1.0})).iloc[-1]
+
+        for column in sorted(REQUIRED_COLS):
+            self.assertAlmostEqual(getattr(state, column), last[column], places=6, msg=column)
+
+    @unittest.skipUnless(os.environ.get("RUN_PERF"), "set RUN_PERF=1 to run performance tests")
+    def test_indicators_scaling(self):
+        close = (np.random.default_rng(0).standard_normal(1_000_000).cumsum() + 100).astype(np.float32)
+        data = pd.DataFrame({"close": close, "volume": np.ones_like(close)}, copy=False)
+
+        start = time.perf_counter()
+        indicators = compute_technical_indicators(data)
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(indicators), len(close))
+        self.assertLess(elapsed, 2.0, f"Indicators took {elapsed:.2f}s for 1M rows.")
+
+    def test_train_or_load_model(self):
+        model = train_or_load_model(self.features, model_path=self.model_path)
         self.assertIsNotNone(model, "Model should be trained or loaded successfully.")
 
+    def test_fit_model(self):
+        # Always trains, unlike the model file above that later runs load from disk
+        with patch.dict(fit_cache, clear=True):
+            model = fit_model(self.features)
+            self.assertIn(model, fit_cache.values(), "Fitted model should be memoized.")
+        self.assertIn(predict_price_movement(model, self.features), (0, 1))
+
+    def test_train_or_load_model_async(self):
+        async def train_twice(model_path):
+            return await asyncio.gather(
+                train_or_load_model_async(self.features, model_path=model_path),
+                train_or_load_model_async(self.features, model_path=model_path),
+            )
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.dict(fit_cache, clear=True), \
+                patch.dict(model_cache), patch.dict(training_counts), \
+                patch("bot_core.fit_model", wraps=fit_model) as fit:
+            model_path = os.path.join(tmp, "model.joblib")
+            first, second = asyncio.run(train_twice(model_path))
+            # The lock lets only the first call train, the second loads its file
+            fit.assert_called_once()
+            self.assertIs(first, second)
+            self.assertIs(train_or_load_model(self.features, model_path=model_path), first)
+
+    def test_training_count_survives_reload(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.dict(fit_cache, clear=True), \
+                patch.dict(model_cache), patch.dict(training_counts), \
+                patch("bot_core.fit_model", wraps=fit_model) as fit:
+            model_path = os.path.join(tmp, "model.joblib")
+            state_path = os.path.join(tmp, "model_state.json")
+            train_or_load_model(self.features, retrain_interval=3, model_path=model_path)
+            train_or_load_model(self.features, retrain_interval=3, model_path=model_path)
+
+            # A restart reads the counter back from the state file
+            training_counts.clear()
+            train_or_load_model(self.features, retrain_interval=3, model_path=model_path)
+            self.assertEqual(fit.call_count, 1)
+            with open(state_path) as f:
+                self.assertEqual(json.load(f), {"training_count": 2})
+
+            train_or_load_model(self.features, retrain_interval=3, model_path=model_path)
+            self.assertEqual(fit.call_count, 2, "Model should retrain at retrain_interval.")
+            with open(state_path) as f:
+                self.assertEqual(json.load(f), {"training_count": 0})
+            self.assertEqual(sorted(os.listdir(tmp)), ["model.joblib", "model_state.json"])
+
+    def test_trailing_stop_loss(self):
+        pct = trailing_stop_loss_pct
+        for entry, current in [(100.0, 90.0), (100.0, 120.0), (100, 100)]:
+            with self.subTest(entry=entry, current=current):
+                stop = trailing_stop_loss(entry, current)
+                self.assertIsInstance(stop, float)
+                self.assertEqual(stop, max(entry * (1 - pct), current * (1 - pct)))
+
+        entries = np.array([100.0, 100.0, 50.0])
+        currents = np.array([90.0, 120.0, 55.0])
+        np.testing.assert_allclose(
+            trailing_stop_loss(entries, currents, pct=0.05),
+            [95.0, 114.0, 52.25],
+        )
+
 if __name__ == "__main__":
     unittest.main()